@@ -1,4 +1,5 @@
 import asyncio
+import os
 
 import aiohttp
 import discord
@@ -52,7 +53,10 @@ async def main() -> None:
     intents.webhooks = False
     intents.integrations = False
 
-    async with aiohttp.ClientSession() as session:
+    # Keep idle connections and DNS results around for longer, so that services called back to back,
+    # like snekbox and the paste service, reuse existing connections instead of doing new TCP and TLS handshakes.
+    connector = aiohttp.TCPConnector(keepalive_timeout=75, ttl_dns_cache=300)
+    async with aiohttp.ClientSession(connector=connector) as session:
         bot.instance = Bot(
             guild_id=constants.Guild.id,
             http_session=session,
@@ -74,8 +78,15 @@ async def main() -> None:
             await _bot.start(constants.Bot.token)
 
 
+# uvloop's event loop has less overhead per I/O operation than the default one, but it doesn't support Windows.
+if os.name == "nt":
+    loop_factory = None
+else:
+    import uvloop
+    loop_factory = uvloop.new_event_loop
+
 try:
-    asyncio.run(main())
+    asyncio.run(main(), loop_factory=loop_factory)
 except StartupError as e:
     message = "Unknown Startup Error Occurred."
     if isinstance(e.exception, aiohttp.ClientConnectorError | aiohttp.ServerDisconnectedError):
@@ -1,18 +1,20 @@
+import asyncio
 import contextlib
 import itertools
-import re
 import time
-from collections import defaultdict
-from collections.abc import Callable, Iterable
+from bisect import bisect_right
+from collections.abc import Callable, Coroutine, Iterable, Iterator
 from contextlib import suppress
 from datetime import datetime
 from itertools import takewhile
-from typing import Literal, TYPE_CHECKING
+from typing import Any, Literal, TYPE_CHECKING
 
-from discord import Colour, Message, NotFound, TextChannel, Thread, User, errors
+import regex
+from discord import Colour, Embed, Message, NotFound, TextChannel, User, errors
 from discord.ext.commands import Cog, Context, Converter, Greedy, command, group, has_any_role
 from discord.ext.commands.converter import TextChannelConverter
-from discord.ext.commands.errors import BadArgument
+from discord.ext.commands.errors import BadArgument, CommandInvokeError
+from discord.utils import time_snowflake
 
 from bot.bot import Bot
 from bot.constants import Channels, CleanMessages, Colours, Emojis, Event, Icons, MODERATION_ROLES
@@ -27,6 +29,18 @@ log = get_logger(__name__)
 
 # Number of seconds before command invocations and responses are deleted in non-moderation channels.
 MESSAGE_DELETE_DELAY = 5
+# Maximum number of channels whose histories are fetched or whose messages are deleted concurrently.
+MAX_CONCURRENT_CHANNELS = 8
+# Maximum number of found messages waiting for deletion per channel while its history is being fetched.
+STREAMED_MESSAGES_LIMIT = 200
+# Number of seconds before the bulk deletion limit from which messages are deleted individually instead,
+# so that they can't age past the limit while their bulk deletion request is waiting on the rate limits.
+BULK_DELETION_MARGIN = 60
+# Number of seconds a regex search in a single message may take before the clean is aborted,
+# to prevent catastrophic backtracking from blocking the bot.
+REGEX_SEARCH_TIMEOUT = 0.05
+# Characters with a special meaning in a regex pattern.
+REGEX_METACHARACTERS = frozenset("\\.^$*+?{}[]|()")
 
 # Type alias for checks for whether a message should be deleted.
 Predicate = Callable[[Message], bool]
@@ -49,20 +63,49 @@ class CleanChannels(Converter):
 class Regex(Converter):
     """A converter that takes a string in the form `.+` and returns the contents of the inline code compiled."""
 
-    async def convert(self, ctx: Context, argument: str) -> re.Pattern:
+    async def convert(self, ctx: Context, argument: str) -> regex.Pattern:
         """Strips the backticks from the string and compiles it to a regex pattern."""
-        match = re.fullmatch(r"`(.+?)`", argument)
-        if not match:
+        if len(argument) < 3 or argument[0] != "`" or argument[-1] != "`":
             raise BadArgument("Regex pattern missing wrapping backticks")
         try:
-            return re.compile(match.group(1), re.IGNORECASE + re.DOTALL)
-        except re.error as e:
+            return regex.compile(argument[1:-1], regex.IGNORECASE | regex.DOTALL)
+        except regex.error as e:
             raise BadArgument(f"Regex error: {e.msg}")
 
 
+def _embed_strings(embeds: Iterable[Embed]) -> Iterator[str | None]:
+    """Yield the text of every searchable attribute of the given embeds."""
+    for embed in embeds:
+        yield embed.title
+        yield embed.description
+        yield embed.footer.text
+        yield embed.author.name
+        for field in embed.fields:
+            yield field.name
+            yield field.value
+
+
 if TYPE_CHECKING:  # Used to allow method resolution in IDEs like in converters.py.
     CleanChannels = Literal["*"] | list[TextChannel]
-    Regex = re.Pattern
+    Regex = regex.Pattern
+
+
+def _literal_pattern(pattern: regex.Pattern) -> tuple[str | None, bool]:
+    """
+    Return the text matched by a pattern without metacharacters, which can be found without the regex engine.
+
+    The text is None if the pattern needs the regex engine. Also return whether the pattern ignores case,
+    in which case the text is lowercase.
+    """
+    ignore_case = bool(pattern.flags & regex.IGNORECASE)
+    text = pattern.pattern
+    if (
+        pattern.flags & regex.VERBOSE  # Whitespace and comments in the pattern aren't matched literally
+        or not REGEX_METACHARACTERS.isdisjoint(text)
+        or (ignore_case and not text.isascii())
+    ):
+        return None, ignore_case
+    return (text.lower() if ignore_case else text), ignore_case
 
 
 class Clean(Cog):
@@ -78,7 +121,11 @@ class Clean(Cog):
 
     def __init__(self, bot: Bot):
         self.bot = bot
+        # Whether a clean is running, from its start until its last request is done.
         self.cleaning = False
+        # Set to ask the running clean to stop before its next request. It's an event, rather than resetting
+        # `cleaning`, so that a clean which is still finishing its requests keeps other cleans from starting.
+        self._cancel = asyncio.Event()
 
     @property
     def mod_log(self) -> ModLog:
@@ -134,10 +181,9 @@ class Clean(Cog):
         else:
             if channels == "*":
                 channels = {
-                    channel for channel in itertools.chain(ctx.guild.channels, ctx.guild.threads)
-                    if isinstance(channel, TextChannel | Thread)
+                    channel for channel in itertools.chain(ctx.guild.text_channels, ctx.guild.threads)
                     # Assume that non-public channels are not needed to optimize for speed.
-                    and channel.permissions_for(ctx.guild.default_role).view_channel
+                    if channel.permissions_for(ctx.guild.default_role).view_channel
                 }
             else:
                 channels = set(channels)
@@ -150,44 +196,63 @@ class Clean(Cog):
         second_limit: datetime | None = None,
         bots_only: bool = False,
         users: list[User] | None = None,
-        regex: re.Pattern | None = None,
+        regex: regex.Pattern | None = None,
     ) -> Predicate:
         """Return the predicate that decides whether to delete a given message."""
         def predicate_bots_only(message: Message) -> bool:
             """Return True if the message was sent by a bot."""
             return message.author.bot
 
+        users_set = frozenset(users) if users else frozenset()
+
         def predicate_specific_users(message: Message) -> bool:
             """Return True if the message was sent by the user provided in the _clean_messages call."""
-            return message.author in users
+            return message.author in users_set
+
+        # Bind the search method once instead of looking it up for every message.
+        search = regex.search if regex else None
+        literal, ignore_case = _literal_pattern(regex) if regex else (None, False)
+
+        def matches(text: str) -> bool:
+            """Search the text for the pattern, treating searches taking too long as not matching."""
+            if literal is not None:
+                if not ignore_case:
+                    return literal in text
+                # Lowercasing only agrees with the engine's case folding for ASCII, so leave other text to the engine.
+                if text.isascii():
+                    return literal in text.lower()
+            try:
+                return search(text, timeout=REGEX_SEARCH_TIMEOUT) is not None
+            except TimeoutError:
+                # Don't keep blocking the bot on every other message, the pattern is just too slow.
+                log.trace(f"Searching for the pattern {regex.pattern!r} timed out.")
+                raise BadArgument("Regex pattern is too slow, try simplifying it.")
 
         def predicate_regex(message: Message) -> bool:
             """Check if the regex provided in _clean_messages matches the message content or any embed attributes."""
-            content = [message.content]
+            content, embeds = message.content, message.embeds
+            if not embeds:
+                # Nothing else to search in, no need to build a combined string
+                return bool(content) and matches(content)
 
-            # Add the content for all embed attributes
-            for embed in message.embeds:
-                content.append(embed.title)
-                content.append(embed.description)
-                content.append(embed.footer.text)
-                content.append(embed.author.name)
-                for field in embed.fields:
-                    content.append(field.name)
-                    content.append(field.value)
+            # Get rid of empty attributes and search the content together with all embed attributes
+            return matches("\n".join(attr for attr in itertools.chain((content,), _embed_strings(embeds)) if attr))
 
-            # Get rid of empty attributes and turn it into a string
-            content = "\n".join(attr for attr in content if attr)
-
-            # Now let's see if there's a regex match
-            return bool(regex.search(content))
+        # Compare snowflakes rather than building a datetime from each message's ID.
+        first_snowflake = time_snowflake(first_limit, high=True)
+        second_snowflake = time_snowflake(second_limit) if second_limit else None
 
         def predicate_range(message: Message) -> bool:
             """Check if the message age is between the two limits."""
-            return first_limit < message.created_at < second_limit
+            return first_snowflake < message.id < second_snowflake
 
         def predicate_after(message: Message) -> bool:
             """Check if the message is younger than the first limit."""
-            return message.created_at > first_limit
+            return message.id > first_snowflake
+
+        if regex and not bots_only and not users and not second_limit:
+            # The regex clean only pairs the pattern with an age limit, check the age inline to save a call per message.
+            return lambda m: m.id > first_snowflake and predicate_regex(m)
 
         predicates = []
         # Set up the correct predicate
@@ -203,8 +268,15 @@ class Clean(Cog):
         if regex:
             predicates.append(predicate_regex)  # Delete messages that match regex
 
+        # Unroll the common combinations to avoid the generator and `all` overhead for every message.
         if len(predicates) == 1:
             return predicates[0]
+        if len(predicates) == 2:
+            p0, p1 = predicates
+            return lambda m: p0(m) and p1(m)
+        if len(predicates) == 3:
+            p0, p1, p2 = predicates
+            return lambda m: p0(m) and p1(m) and p2(m)
         return lambda m: all(pred(m) for pred in predicates)
 
     async def _delete_invocation(self, ctx: Context) -> None:
@@ -226,51 +298,22 @@ class Clean(Cog):
         channels: set[TextChannel],
         to_delete: Predicate,
         lower_limit: datetime
-    ) -> tuple[defaultdict[TextChannel, list], list[int]]:
+    ) -> dict[TextChannel, list[Message]]:
         """Helper function for getting messages from the cache."""
-        message_mappings = defaultdict(list)
-        message_ids = []
+        message_mappings: dict[TextChannel, list[Message]] = {}
         for message in takewhile(lambda m: m.created_at > lower_limit, reversed(self.bot.cached_messages)):
-            if not self.cleaning:
-                # Cleaning was canceled
-                return message_mappings, message_ids
-
             if message.channel in channels and to_delete(message):
-                message_mappings[message.channel].append(message)
-                message_ids.append(message.id)
+                message_mappings.setdefault(message.channel, []).append(message)
 
-        return message_mappings, message_ids
-
-    async def _get_messages_from_channels(
-        self,
-        channels: Iterable[TextChannel],
-        to_delete: Predicate,
-        after: datetime,
-        before: datetime | None = None
-    ) -> tuple[defaultdict[TextChannel, list], list]:
-        """
-        Collect the messages for deletion by iterating over the histories of the appropriate channels.
-
-        The clean cog enforces an upper limit on message age through `_validate_input`.
-        """
-        message_mappings = defaultdict(list)
-        message_ids = []
-
-        for channel in channels:
-            async for message in channel.history(limit=CleanMessages.message_limit, before=before, after=after):
-
-                if not self.cleaning:
-                    # Cleaning was canceled, return empty containers.
-                    return defaultdict(list), []
-
-                if to_delete(message):
-                    message_mappings[message.channel].append(message)
-                    message_ids.append(message.id)
-
-        return message_mappings, message_ids
+        return message_mappings
 
     @staticmethod
-    def is_older_than_14d(message: Message) -> bool:
+    def _two_weeks_old_snowflake() -> int:
+        """Return the snowflake of a hypothetical message sent exactly 14 days ago, the bulk deletion limit."""
+        return (time.time_ns() // 1_000_000 - 14 * 24 * 60 * 60 * 1000 - 1420070400000) << 22
+
+    @classmethod
+    def is_older_than_14d(cls, message: Message) -> bool:
         """
         Precisely checks if message is older than 14 days, bulk deletion limit.
 
@@ -278,66 +321,188 @@ class Clean(Cog):
         Comparison on message age could possibly be less accurate which in turn would resort in problems
         with message deletion if said messages are very close to the 14d mark.
         """
-        two_weeks_old_snowflake = int((time.time() - 14 * 24 * 60 * 60) * 1000.0 - 1420070400000) << 22
-        return message.id < two_weeks_old_snowflake
-
-    async def _delete_messages_individually(self, messages: list[Message]) -> list[Message]:
-        """Delete each message in the list unless cleaning is cancelled. Return the deleted messages."""
-        deleted = []
+        return message.id < cls._two_weeks_old_snowflake()
+
+    @classmethod
+    def _bulk_deletion_threshold(cls) -> int:
+        """Return the snowflake below which messages are deleted individually rather than in bulk."""
+        return cls._two_weeks_old_snowflake() + (BULK_DELETION_MARGIN * 1000 << 22)
+
+    async def _delete_in_bulk(self, channel: TextChannel, messages: list[Message]) -> bool:
+        """Delete up to 100 messages of `channel` at once. Return False if cleaning was cancelled before the request."""
+        if self._cancel.is_set():
+            return False
+        # Deletion requests aren't abandoned when cancelling, so that all deleted messages end up in the clean log.
+        self.mod_log.ignore(Event.message_delete, *(message.id for message in messages))
+        with suppress(NotFound):
+            await channel.delete_messages(messages)
+        return True
+
+    async def _delete_messages_individually(self, messages: list[Message], deleted: list[Message]) -> None:
+        """Delete each message in the list unless cleaning is cancelled, adding the deleted messages to `deleted`."""
         for message in messages:
-            # Ensure that deletion was not canceled
-            if not self.cleaning:
-                return deleted
+            if self._cancel.is_set():
+                # Means that the cleaning was canceled
+                return
+            self.mod_log.ignore(Event.message_delete, message.id)
             with contextlib.suppress(NotFound):  # Message doesn't exist or was already deleted
                 await message.delete()
                 deleted.append(message)
-        return deleted
 
-    async def _delete_found(self, message_mappings: dict[TextChannel, list[Message]]) -> list[Message]:
+    async def _delete_per_channel(self, deletions: Iterable[Coroutine[Any, Any, None]]) -> None:
+        """
+        Run the deletions of several channels concurrently.
+
+        If one of them fails, the clean is cancelled so that the others stop before their next request,
+        and the error is raised once all of them are over. This way nothing is deleted after the clean has failed.
+        """
+        async def run(deletion: Coroutine[Any, Any, None]) -> None:
+            try:
+                await deletion
+            except Exception:
+                self._cancel.set()
+                raise
+
+        results = await asyncio.gather(*(run(deletion) for deletion in deletions), return_exceptions=True)
+        for result in results:
+            if isinstance(result, BaseException):
+                raise result
+
+    async def _delete_found(
+        self,
+        message_mappings: dict[TextChannel, list[Message]],
+        deleted: list[Message] | None = None,
+    ) -> list[Message]:
         """
         Delete the detected messages.
 
         Deletion is made in bulk per channel for messages less than 14d old.
         The function returns the deleted messages.
         If cleaning was cancelled in the middle, return messages already deleted.
+        The messages are also added to `deleted` as they're deleted, so that they're known if the deletion fails.
         """
-        deleted = []
-        for channel, messages in message_mappings.items():
-            to_delete = []
-
-            delete_old = False
-            for current_index, message in enumerate(messages):  # noqa: B007
-                if not self.cleaning:
-                    # Means that the cleaning was canceled
-                    return deleted
-
-                if self.is_older_than_14d(message):
-                    # Further messages are too old to be deleted in bulk
-                    delete_old = True
-                    break
-
-                to_delete.append(message)
-
-                if len(to_delete) == 100:
+        deleted = [] if deleted is None else deleted
+        # Bulk deletion is rate limited per channel, so the channels can be handled concurrently.
+        semaphore = asyncio.Semaphore(MAX_CONCURRENT_CHANNELS)
+
+        async def delete_from_channel(channel: TextChannel, messages: list[Message]) -> None:
+            """Delete the messages of a single channel."""
+            start = 0
+
+            async with semaphore:
+                while True:
+                    # The cache is walked newest first, so the messages too old to be deleted in bulk are at the end.
+                    # The limit is found for every bulk, as messages keep aging while the previous ones are deleted.
+                    threshold = self._bulk_deletion_threshold()
+                    boundary = bisect_right(messages, -threshold, lo=start, key=lambda m: -m.id)
+                    if boundary == start:
+                        break
                     # Only up to 100 messages can be deleted in a bulk
-                    await channel.delete_messages(to_delete)
-                    deleted.extend(to_delete)
-                    to_delete.clear()
-
-            if not self.cleaning:
-                return deleted
-            if len(to_delete) > 0:
-                # Deleting any leftover messages if there are any
-                with suppress(NotFound):
-                    await channel.delete_messages(to_delete)
-                deleted.extend(to_delete)
-
-            if not self.cleaning:
-                return deleted
-            if delete_old:
-                old_deleted = await self._delete_messages_individually(messages[current_index:])
-                deleted.extend(old_deleted)
+                    batch = messages[start:min(boundary, start + 100)]
+                    if not await self._delete_in_bulk(channel, batch):
+                        # Means that the cleaning was canceled
+                        return
+                    deleted.extend(batch)
+                    start += len(batch)
+
+                if start < len(messages):
+                    await self._delete_messages_individually(messages[start:], deleted)
+
+        await self._delete_per_channel(
+            delete_from_channel(channel, messages) for channel, messages in message_mappings.items()
+        )
+        return deleted
+
+    async def _delete_from_channels(
+        self,
+        channels: Iterable[TextChannel],
+        to_delete: Predicate,
+        after: datetime,
+        before: datetime | None = None,
+        deleted: list[Message] | None = None,
+    ) -> list[Message]:
+        """
+        Delete the matching messages while iterating over the histories of the appropriate channels.
 
+        For each channel, the history is fed through a bounded queue to a consumer deleting the messages, so deletion
+        starts without waiting for the whole history to be fetched and found messages don't pile up in memory.
+        The clean cog enforces an upper limit on message age through `_validate_input`.
+        The function returns the deleted messages.
+        If cleaning was cancelled in the middle, return messages already deleted.
+        The messages are also added to `deleted` as they're deleted, so that they're known if the deletion fails.
+        """
+        deleted = [] if deleted is None else deleted
+        # Bound the amount of concurrent history requests to avoid hammering the rate limits.
+        semaphore = asyncio.Semaphore(MAX_CONCURRENT_CHANNELS)
+
+        async def clean_channel(channel: TextChannel) -> None:
+            """Delete the matching messages of a single channel as they are found."""
+            queue: asyncio.Queue[Message | None] = asyncio.Queue(maxsize=STREAMED_MESSAGES_LIMIT)
+
+            async def produce() -> None:
+                """Put the matching messages in the queue, followed by None once the history is exhausted."""
+                try:
+                    async for message in channel.history(
+                        limit=CleanMessages.message_limit, before=before, after=after
+                    ):
+                        if self._cancel.is_set():
+                            # Means that the cleaning was canceled, the consumer may be waiting for a match forever
+                            break
+                        if to_delete(message):
+                            await queue.put(message)
+                except Exception:
+                    # Let the consumer delete what was already found before the error propagates.
+                    await queue.put(None)
+                    raise
+                await queue.put(None)
+
+            async def consume() -> None:
+                """Delete the messages from the queue, in bulk if they're young enough."""
+                batch = []
+
+                async def delete_batch() -> bool:
+                    """Delete the batch, returning False if cleaning was cancelled."""
+                    # Messages keep aging while the batch fills up, so they're only sorted by age right before deleting.
+                    threshold = self._bulk_deletion_threshold()
+                    old = [message for message in batch if message.id < threshold]
+                    young = [message for message in batch if message.id >= threshold]
+                    if old:
+                        await self._delete_messages_individually(old, deleted)
+                    if young and await self._delete_in_bulk(channel, young):
+                        deleted.extend(young)
+                    return not self._cancel.is_set()
+
+                while (message := await queue.get()) is not None:
+                    if message.id < self._bulk_deletion_threshold():
+                        # Too old to be deleted in bulk. History yields these first, as it goes oldest first.
+                        await self._delete_messages_individually([message], deleted)
+                        if self._cancel.is_set():
+                            # Means that the cleaning was canceled
+                            return
+                        continue
+
+                    batch.append(message)
+                    if len(batch) == 100:  # Only up to 100 messages can be deleted in a bulk
+                        if not await delete_batch():
+                            # Means that the cleaning was canceled
+                            return
+                        batch = []
+
+                if batch:
+                    await delete_batch()
+
+            async with semaphore:
+                producer = asyncio.create_task(produce())
+                try:
+                    await consume()
+                finally:
+                    # The producer is still running if the consumer stopped early.
+                    producer.cancel()
+                    with suppress(asyncio.CancelledError):
+                        # Propagates any error raised while fetching the history.
+                        await producer
+
+        await self._delete_per_channel(clean_channel(channel) for channel in channels)
         return deleted
 
     async def _modlog_cleaned_messages(
@@ -352,9 +517,10 @@ class Clean(Cog):
             await self._send_expiring_message(ctx, ":x: No matching messages could be found.")
             return None
 
-        # Reverse the list to have reverse chronological order
-        log_messages = reversed(messages)
-        log_url = await upload_log(log_messages, ctx.author.id)
+        # Reverse the list to have reverse chronological order.
+        # Done in place, as the caller only needs the amount of deleted messages afterwards.
+        messages.reverse()
+        log_url = await upload_log(messages, ctx.author.id)
 
         # Build the embed and send it
         if channels == "*":
@@ -387,7 +553,7 @@ class Clean(Cog):
         channels: CleanChannels | None,
         bots_only: bool = False,
         users: list[User] | None = None,
-        regex: re.Pattern | None = None,
+        regex: regex.Pattern | None = None,
         first_limit: CleanLimit | None = None,
         second_limit: CleanLimit | None = None,
         attempt_delete_invocation: bool = True,
@@ -402,45 +568,59 @@ class Clean(Cog):
             )
             return None
         self.cleaning = True
+        self._cancel.clear()
 
-        deletion_channels = self._channels_set(channels, ctx, first_limit, second_limit)
-
-        if isinstance(first_limit, Message):
-            first_limit = first_limit.created_at
-        if isinstance(second_limit, Message):
-            second_limit = second_limit.created_at
-        if first_limit and second_limit:
-            first_limit, second_limit = sorted([first_limit, second_limit])
-
-        # Needs to be called after standardizing the input.
-        predicate = self._build_predicate(first_limit, second_limit, bots_only, users, regex)
-
-        if attempt_delete_invocation:
-            # Delete the invocation first
-            await self._delete_invocation(ctx)
-
-        if self._use_cache(first_limit):
-            log.trace(f"Messages for cleaning by {ctx.author.id} will be searched in the cache.")
-            message_mappings, message_ids = self._get_messages_from_cache(
-                channels=deletion_channels, to_delete=predicate, lower_limit=first_limit
-            )
-        else:
-            log.trace(f"Messages for cleaning by {ctx.author.id} will be searched in channel histories.")
-            message_mappings, message_ids = await self._get_messages_from_channels(
-                channels=deletion_channels,
-                to_delete=predicate,
-                after=first_limit,  # Remember first is the earlier datetime (the "older" time).
-                before=second_limit
-            )
+        deleted_messages = []
+        try:
+            deletion_channels = self._channels_set(channels, ctx, first_limit, second_limit)
 
-        if not self.cleaning:
-            # Means that the cleaning was canceled
-            return None
+            if isinstance(first_limit, Message):
+                first_limit = first_limit.created_at
+            if isinstance(second_limit, Message):
+                second_limit = second_limit.created_at
+            if first_limit and second_limit:
+                first_limit, second_limit = sorted([first_limit, second_limit])
+
+            # Needs to be called after standardizing the input.
+            predicate = self._build_predicate(first_limit, second_limit, bots_only, users, regex)
+
+            if attempt_delete_invocation:
+                # Delete the invocation first
+                await self._delete_invocation(ctx)
+
+            if self._use_cache(first_limit):
+                log.trace(f"Messages for cleaning by {ctx.author.id} will be searched in the cache.")
+                message_mappings = self._get_messages_from_cache(
+                    channels=deletion_channels, to_delete=predicate, lower_limit=first_limit
+                )
+
+                if self._cancel.is_set():
+                    # Means that the cleaning was canceled
+                    return None
 
-        # Now let's delete the actual messages with purge.
-        self.mod_log.ignore(Event.message_delete, *message_ids)
-        deleted_messages = await self._delete_found(message_mappings)
-        self.cleaning = False
+                # Now let's delete the actual messages with purge.
+                deleted_messages = await self._delete_found(message_mappings, deleted_messages)
+            else:
+                log.trace(f"Messages for cleaning by {ctx.author.id} will be searched in channel histories.")
+                deleted_messages = await self._delete_from_channels(
+                    channels=deletion_channels,
+                    to_delete=predicate,
+                    after=first_limit,  # Remember first is the earlier datetime (the "older" time).
+                    before=second_limit,
+                    deleted=deleted_messages,
+                )
+        except Exception as e:
+            if deleted_messages:
+                # Log what was deleted before the clean failed, so that it doesn't vanish without an audit trail.
+                await self._modlog_cleaned_messages(deleted_messages, channels or deletion_channels, ctx)
+            if isinstance(e, BadArgument):
+                # Raised by the predicate while searching the messages, once the clean has already started.
+                await self._send_expiring_message(ctx, f":x: {e}")
+                return None
+            raise
+        finally:
+            # Only reset once the clean is over, so a new clean can't start while this one is still finishing requests.
+            self.cleaning = False
 
         if not channels:
             channels = deletion_channels
@@ -629,7 +809,7 @@ class Clean(Cog):
         if not self.cleaning:
             message = ":question: There's no cleaning going on."
         else:
-            self.cleaning = False
+            self._cancel.set()
             message = f"{Emojis.check_mark} Clean interrupted."
 
         await self._send_expiring_message(ctx, message)
@@ -660,7 +840,10 @@ class Clean(Cog):
 
     async def cog_command_error(self, ctx: Context, error: Exception) -> None:
         """Safely end the cleaning operation on unexpected errors."""
-        self.cleaning = False
+        if isinstance(error, CommandInvokeError):
+            # Stop anything of the failed clean which may still be running.
+            self._cancel.set()
+            self.cleaning = False
 
 
 async def setup(bot: Bot) -> None:
@@ -1,5 +1,6 @@
 from __future__ import annotations
 
+import asyncio
 import contextlib
 import re
 from collections.abc import Iterable
@@ -11,7 +12,7 @@ from typing import Literal, NamedTuple, TYPE_CHECKING, get_args
 from discord import AllowedMentions, HTTPException, Interaction, Message, NotFound, Reaction, User, enums, ui
 from discord.ext.commands import Cog, Command, Context, Converter, command, guild_only
 from pydis_core.utils import interactions, paste_service
-from pydis_core.utils.paste_service import PasteFile, send_to_paste_service
+from pydis_core.utils.paste_service import MAX_PASTE_SIZE, PasteFile, send_to_paste_service
 from pydis_core.utils.regex import FORMATTED_CODE_REGEX, RAW_CODE_REGEX
 
 from bot.bot import Bot
@@ -94,6 +95,10 @@ class FilteredFiles(NamedTuple):
     blocked: list[FileAttachment]
 
 
+# The text processing in this cog (extracting code blocks and formatting output) is kept in plain Python.
+# Each job is dominated by the requests to snekbox, the paste service and Discord, and snekbox output
+# is capped in size, so compiling these functions (e.g. with Cython or Numba) wouldn't make jobs faster.
+# Only reconsider that if formatting ever shows up next to the network awaits in a profile.
 class CodeblockConverter(Converter):
     """Attempts to extract code from a codeblock, if provided."""
 
@@ -108,7 +113,14 @@ class CodeblockConverter(Converter):
 
         Return a list of code blocks if any, otherwise return a list with a single string of code.
         """
-        if match := list(FORMATTED_CODE_REGEX.finditer(code)):
+        if "`" not in code:
+            # There can't be a code block without backticks, so skip both patterns and only strip the leading
+            # blank lines and trailing whitespace, the same way RAW_CODE_REGEX would.
+            start = len(code) - len(code.lstrip(" \t\n"))
+            start = code.rfind("\n", 0, start) + 1
+            codeblocks = [dedent(code[start:].rstrip())]
+            info = "unformatted code"
+        elif match := list(FORMATTED_CODE_REGEX.finditer(code)):
             blocks = [block for block in match if block.group("block")]
 
             if len(blocks) > 1:
@@ -171,7 +183,13 @@ class Snekbox(Cog):
 
     def __init__(self, bot: Bot):
         self.bot = bot
-        self.jobs = {}
+        # Maps the message invoking a job to the bot's most recent response to it.
+        self.jobs: dict[int, int] = {}
+
+    @property
+    def filter_cog(self) -> Filtering | None:
+        """Get currently loaded Filtering cog instance, if any."""
+        return self.bot.get_cog("Filtering")
 
     def build_python_version_switcher_view(
         self,
@@ -217,6 +235,16 @@ class Snekbox(Cog):
         except paste_service.PasteUploadError:
             return "unable to upload"
 
+    def start_output_upload(self, output: str) -> asyncio.Future[str | None]:
+        """Start uploading the job's output to a paste service, and return a future resolving to its URL."""
+        # A character takes at least one byte, so the paste service would reject this output without a request.
+        if len(output) > MAX_PASTE_SIZE:
+            too_long = asyncio.get_running_loop().create_future()
+            too_long.set_result("too long to upload")
+            return too_long
+
+        return asyncio.create_task(self.upload_output(output))
+
     @staticmethod
     def prepare_timeit_input(codeblocks: list[str]) -> list[str]:
         """
@@ -228,51 +256,60 @@ class Snekbox(Cog):
         setup_code = codeblocks.pop(0) if len(codeblocks) > 1 else ""
         code = "\n".join(codeblocks)
 
+        # The code is passed to timeit as separate arguments rather than interpolated into a script,
+        # so it never needs to be escaped.
         args.extend(["-s", TIMEIT_SETUP_WRAPPER.format(setup=setup_code), code])
         return args
 
-    async def format_output(
+    def format_output(
         self,
         output: str,
         max_lines: int = MAX_OUTPUT_BLOCK_LINES,
         max_chars: int = MAX_OUTPUT_BLOCK_CHARS,
         line_nums: bool = True,
         output_default: str = "[No output]",
-    ) -> tuple[str, str | None]:
+    ) -> tuple[str, asyncio.Future[str | None] | None]:
         """
-        Format the output and return a tuple of the formatted output and a URL to the full output.
+        Format the output and return a tuple of the formatted output and a future uploading the full output.
 
         Prepend each line with a line number. Truncate if there are over 10 lines or 1000 characters
-        and upload the full output to a paste service.
+        and start uploading the full output to a paste service. The future resolves to a URL to the full output,
+        and is None if nothing needs to be uploaded.
         """
         output = output.rstrip("\n")
         original_output = output  # To be uploaded to a pasting service if needed
-        paste_link = None
+        paste_task = None
 
-        if "<@" in output:
-            output = output.replace("<@", "<@\u200B")  # Zero-width space
+        # Both kinds of mentions contain an @, so most outputs only need to be scanned once.
+        if "@" in output:
+            if "<@" in output:
+                output = output.replace("<@", "<@\u200B")  # Zero-width space
 
-        if "<!@" in output:
-            output = output.replace("<!@", "<!@\u200B")  # Zero-width space
+            if "<!@" in output:
+                output = output.replace("<!@", "<!@\u200B")  # Zero-width space
 
-        if ESCAPE_REGEX.findall(output):
-            paste_link = await self.upload_output(original_output)
-            return "Code block escape attempt detected; will not output result", paste_link
+        if ESCAPE_REGEX.search(output):
+            paste_task = self.start_output_upload(original_output)
+            return "Code block escape attempt detected; will not output result", paste_task
 
-        truncated = False
         lines = output.splitlines()
+        number_lines = line_nums and len(lines) > 1
+        truncated = len(lines) > max_lines
 
-        if len(lines) > 1 and line_nums:
-            lines = [f"{i:03d} | {line}" for i, line in enumerate(lines, 1)]
-            output = "\n".join(lines)
-
-        if len(lines) > max_lines:
-            truncated = True
+        # Cut the lines before numbering them, so that only the lines which are kept are formatted and joined.
+        if truncated:
             if len(lines) == max_lines + 1:
                 lines = lines[:max_lines - 1]
             else:
                 lines = lines[:max_lines]
+
+        if number_lines:
+            lines = [f"{i:03d} | {line}" for i, line in enumerate(lines, 1)]
+
+        if number_lines or truncated:
             output = "\n".join(lines)
+
+        if truncated:
             if len(output) >= max_chars:
                 output = f"{output[:max_chars]}\n... (truncated - too long, too many lines)"
             else:
@@ -285,28 +322,28 @@ class Snekbox(Cog):
             # ANSI colors are quite nice, but don't render in pinwand,
             #   thus mangling the output
             ansiless_output = ANSI_REGEX.sub("", original_output)
-            paste_link = await self.upload_output(ansiless_output)
+            paste_task = self.start_output_upload(ansiless_output)
 
         if output_default and not output:
             output = output_default
 
-        return output, paste_link
+        return output, paste_task
 
     async def format_file_text(self, text_files: list[FileAttachment], output: str) -> str:
         # Inline until budget, then upload to paste service
         # Budget is shared with stdout, so subtract what we've already used
         budget_lines = MAX_OUTPUT_BLOCK_LINES - (output.count("\n") + 1)
         budget_chars = MAX_OUTPUT_BLOCK_CHARS - len(output)
-        msg = ""
+        msg_parts = []
 
         for file in text_files:
             file_text = file.content.decode("utf-8", errors="replace") or "[Empty]"
             # Override to always allow 1 line and <= 50 chars, since this is less than a link
             if len(file_text) <= 50 and not file_text.count("\n"):
-                msg += f"\n`{file.name}`\n```\n{file_text}\n```"
+                msg_parts.append(f"\n`{file.name}`\n```\n{file_text}\n```")
             # otherwise, use budget
             else:
-                format_text, link_text = await self.format_output(
+                format_text, link_task = self.format_output(
                     file_text,
                     budget_lines,
                     budget_chars,
@@ -314,14 +351,14 @@ class Snekbox(Cog):
                     output_default="[Empty]"
                 )
                 # With any link, use it (don't use budget)
-                if link_text:
-                    msg += f"\n`{file.name}`\n{link_text}"
+                if link_task:
+                    msg_parts.append(f"\n`{file.name}`\n{await link_task}")
                 else:
-                    msg += f"\n`{file.name}`\n```\n{format_text}\n```"
+                    msg_parts.append(f"\n`{file.name}`\n```\n{format_text}\n```")
                     budget_lines -= format_text.count("\n") + 1
                     budget_chars -= len(file_text)
 
-        return msg
+        return "".join(msg_parts)
 
     def format_blocked_extensions(self, blocked: list[FileAttachment]) -> str:
         # Sort by length and then lexicographically to fit as many as possible before truncating.
@@ -392,69 +429,95 @@ class Snekbox(Cog):
 
             log.trace("Formatting output...")
             output = result.error_message if result.error_message else result.stdout
-            output, paste_link = await self.format_output(output)
-
-            status_msg = result.get_status_message(job)
-            msg = f"{result.status_emoji} {status_msg}.\n"
-
-            # This is done to make sure the last line of output contains the error
-            # and the error is not manually printed by the author with a syntax error.
-            if result.stdout.rstrip().endswith("EOFError: EOF when reading a line") and result.returncode == 1:
-                msg += "\n:warning: Note: `input` is not supported by the bot :warning:\n"
-
-            # Skip output if it's empty and there are file uploads
-            if result.stdout or not result.has_files:
-                msg += f"\n```ansi\n{output}\n```"
-
-            if paste_link:
-                msg += f"\nFull output: {paste_link}"
-
-            # Additional files error message after output
-            if files_error := result.files_error_message:
-                msg += f"\n{files_error}"
-
-            # Split text files
-            text_files = [f for f in result.files if f.suffix in TXT_LIKE_FILES]
-            msg += await self.format_file_text(text_files, output)
-
-            filter_cog: Filtering | None = self.bot.get_cog("Filtering")
-            blocked_exts = set()
-            # Include failed files in the scan.
-            failed_files = [FileAttachment(name, b"") for name in result.failed_files]
-            total_files = result.files + failed_files
-            if filter_cog:
-                block_output, blocked_exts = await filter_cog.filter_snekbox_output(msg, total_files, ctx.message)
-                if block_output:
-                    return await ctx.send("Attempt to circumvent filter detected. Moderator team has been alerted.")
-
-            # Filter file extensions
-            allowed, blocked = self._filter_files(ctx, result.files, blocked_exts)
-            blocked.extend(self._filter_files(ctx, failed_files, blocked_exts).blocked)
-            if blocked:
-                msg += self.format_blocked_extensions(blocked)
-
-            # Upload remaining non-text files
-            files = [f.to_file() for f in allowed if f not in text_files]
-            allowed_mentions = AllowedMentions(everyone=False, roles=False, users=[ctx.author])
-            view = self.build_python_version_switcher_view(job.version, ctx, job)
-
-            if ctx.message.channel == ctx.channel:
-                # Don't fail if the command invoking message was deleted.
-                message = ctx.message.to_reference(fail_if_not_exists=False)
-                response = await ctx.send(
-                    msg,
-                    allowed_mentions=allowed_mentions,
-                    view=view,
-                    files=files,
-                    reference=message
-                )
-            else:
-                # The command was redirected so a reply wont work, send a normal message with a mention.
-                msg = f"{ctx.author.mention} {msg}"
-                response = await ctx.send(msg, allowed_mentions=allowed_mentions, view=view, files=files)
-            view.message = response
+            output, paste_task = self.format_output(output)
 
-            log.info(f"{ctx.author}'s {job.name} job had a return code of {result.returncode}")
+            try:
+                status_msg = result.get_status_message(job)
+                # The message is assembled from parts, which are joined once rather than growing a string with each one.
+                msg_parts = [f"{result.status_emoji} {status_msg}.\n"]
+
+                # This is done to make sure the last line of output contains the error
+                # and the error is not manually printed by the author with a syntax error.
+                if result.returncode == 1 and result.stdout.rstrip().endswith("EOFError: EOF when reading a line"):
+                    msg_parts.append("\n:warning: Note: `input` is not supported by the bot :warning:\n")
+
+                # Skip output if it's empty and there are file uploads
+                if result.stdout or not result.has_files:
+                    msg_parts.append(f"\n```ansi\n{output}\n```")
+                msg = "".join(msg_parts)
+
+                # The link to the full output belongs here, but it's edited in after the response is sent,
+                # so that the upload to the paste service overlaps with sending the response.
+                footer_parts = []
+
+                # Additional files error message after output
+                if files_error := result.files_error_message:
+                    footer_parts.append(f"\n{files_error}")
+
+                # Split text files
+                text_files = [f for f in result.files if f.suffix in TXT_LIKE_FILES]
+                footer_parts.append(await self.format_file_text(text_files, output))
+
+                filter_cog = self.filter_cog
+                blocked_exts = set()
+                # Include failed files in the scan.
+                failed_files = [FileAttachment(name, b"") for name in result.failed_files]
+                total_files = result.files + failed_files
+                if filter_cog:
+                    block_output, blocked_exts = await filter_cog.filter_snekbox_output(
+                        "".join((msg, *footer_parts)), total_files, ctx.message
+                    )
+                    if block_output:
+                        return await ctx.send("Attempt to circumvent filter detected. Moderator team has been alerted.")
+
+                # Filter file extensions
+                allowed, blocked = self._filter_files(ctx, result.files, blocked_exts)
+                blocked.extend(self._filter_files(ctx, failed_files, blocked_exts).blocked)
+                if blocked:
+                    footer_parts.append(self.format_blocked_extensions(blocked))
+                footer = "".join(footer_parts)
+
+                # Upload remaining non-text files
+                files = [f.to_file() for f in allowed if f not in text_files]
+                allowed_mentions = AllowedMentions(everyone=False, roles=False, users=[ctx.author])
+                view = self.build_python_version_switcher_view(job.version, ctx, job)
+
+                if ctx.message.channel == ctx.channel:
+                    # Don't fail if the command invoking message was deleted.
+                    message = ctx.message.to_reference(fail_if_not_exists=False)
+                    response = await ctx.send(
+                        msg + footer,
+                        allowed_mentions=allowed_mentions,
+                        view=view,
+                        files=files,
+                        reference=message
+                    )
+                else:
+                    # The command was redirected so a reply wont work, send a normal message with a mention.
+                    msg = f"{ctx.author.mention} {msg}"
+                    response = await ctx.send(msg + footer, allowed_mentions=allowed_mentions, view=view, files=files)
+                view.message = response
+
+                if paste_task:
+                    try:
+                        paste_link = await paste_task
+                    except Exception:
+                        # The response was already sent, so don't fail the whole job because of the link.
+                        log.exception(f"Failed to upload the full output of {ctx.author}'s {job.name} job.")
+                        paste_link = "unable to upload"
+                    # Don't fail if the response was deleted in the meantime.
+                    with contextlib.suppress(NotFound):
+                        await response.edit(content=f"{msg}\nFull output: {paste_link}{footer}")
+
+                log.info(f"{ctx.author}'s {job.name} job had a return code of {result.returncode}")
+            finally:
+                if paste_task:
+                    # Stop the upload if the response couldn't be sent.
+                    paste_task.cancel()
+                    if paste_task.done() and not paste_task.cancelled():
+                        # Retrieve the outcome of an upload which finished without being awaited, so an error isn't
+                        # reported as never retrieved.
+                        paste_task.exception()
         return response
 
     async def continue_job(
@@ -485,7 +548,7 @@ class Snekbox(Cog):
 
                 # Ensure the response that's about to be edited is still the most recent.
                 # This could have already been updated via a button press to switch to an alt Python version.
-                if self.jobs[ctx.message.id] != response.id:
+                if self.jobs.get(ctx.message.id) != response.id:
                     return None
 
                 code = await self.get_code(new_message, ctx.command)
@@ -535,7 +598,7 @@ class Snekbox(Cog):
         job: EvalJob,
     ) -> None:
         """Handles checks, stats and re-evaluation of a snekbox job."""
-        if Roles.helpers in (role.id for role in ctx.author.roles):
+        if ctx.author.get_role(Roles.helpers):
             self.bot.stats.incr("snekbox_usages.roles.helpers")
         else:
             self.bot.stats.incr("snekbox_usages.roles.developers")
@@ -549,25 +612,32 @@ class Snekbox(Cog):
 
         log.info(f"Received code from {ctx.author} for evaluation:\n{job}")
 
-        while True:
-            try:
-                response = await self.send_job(ctx, job)
-            except LockedResourceError:
-                await ctx.send(
-                    f"{ctx.author.mention} You've already got a job running - "
-                    "please wait for it to finish!"
-                )
-                return
-
-            # Store the bot's response message id per invocation, to ensure the `wait_for`s in `continue_job`
-            # don't trigger if the response has already been replaced by a new response.
-            # This can happen when a button is pressed and then original code is edited and re-run.
-            self.jobs[ctx.message.id] = response.id
-
-            job = await self.continue_job(ctx, response, job.name)
-            if not job:
-                break
-            log.info(f"Re-evaluating code from message {ctx.message.id}:\n{job}")
+        response = None
+        try:
+            while True:
+                try:
+                    response = await self.send_job(ctx, job)
+                except LockedResourceError:
+                    await ctx.send(
+                        f"{ctx.author.mention} You've already got a job running - "
+                        "please wait for it to finish!"
+                    )
+                    return
+
+                # Store the bot's response message id per invocation, to ensure the `wait_for`s in `continue_job`
+                # don't trigger if the response has already been replaced by a new response.
+                # This can happen when a button is pressed and then original code is edited and re-run.
+                self.jobs[ctx.message.id] = response.id
+
+                job = await self.continue_job(ctx, response, job.name)
+                if not job:
+                    break
+                log.info(f"Re-evaluating code from message {ctx.message.id}:\n{job}")
+        finally:
+            # Forget the finished session however it ended,
+            # unless a newer response took it over, e.g. by switching the Python version.
+            if response is not None and self.jobs.get(ctx.message.id) == response.id:
+                del self.jobs[ctx.message.id]
 
     @command(name="eval", aliases=("e",), usage="[python_version] <code, ...>")
     @guild_only()
@@ -1,6 +1,13 @@
+import asyncio
 import unittest
+from datetime import UTC, datetime, timedelta
 from unittest.mock import AsyncMock, MagicMock, patch
 
+import regex
+from discord import Embed, HTTPException
+from discord.ext.commands import BadArgument, CommandInvokeError
+from discord.utils import time_snowflake
+
 from bot.exts.moderation.clean import Clean
 from tests.helpers import MockBot, MockContext, MockGuild, MockMember, MockMessage, MockRole, MockTextChannel
 
@@ -102,3 +109,287 @@ class CleanTests(unittest.IsolatedAsyncioTestCase):
         sent_message = mocked_mods.send.await_args[0][0]
         self.assertIn(self.log_url, sent_message)
         self.assertIn("2 messages", sent_message)
+
+
+    async def test_clean_stays_ongoing_until_cancelled_clean_finishes(self):
+        """Cancelling should stop the running clean, but only let another one start once it has finished."""
+        deletion_started, finish_deletion = asyncio.Event(), asyncio.Event()
+
+        async def delete_found(message_mappings, deleted=None):
+            deletion_started.set()
+            await finish_deletion.wait()
+            return [42]
+
+        self.cog._delete_found = delete_found
+        self.bot.get_channel = MagicMock(return_value=False)
+        self.cog._send_expiring_message = AsyncMock()
+        self.cog._delete_invocation = AsyncMock()
+
+        clean = asyncio.create_task(
+            self.cog._clean_messages(self.ctx, None, first_limit=MockMessage(), attempt_delete_invocation=False)
+        )
+        await deletion_started.wait()
+        await self.cog.clean_cancel(self.cog, self.ctx)
+
+        self.assertTrue(self.cog._cancel.is_set())
+        self.assertTrue(self.cog.cleaning)
+
+        finish_deletion.set()
+        await clean
+        self.assertFalse(self.cog.cleaning)
+
+    async def test_clean_logs_messages_deleted_before_failure(self):
+        """Messages deleted before the deletion failed should still be logged."""
+        async def delete_found(message_mappings, deleted):
+            deleted.append(42)
+            raise HTTPException(MagicMock(status=500), "error")
+
+        self.cog._delete_found = delete_found
+        self.cog._delete_invocation = AsyncMock()
+
+        with self.assertRaises(HTTPException):
+            await self.cog._clean_messages(self.ctx, None, first_limit=MockMessage(), attempt_delete_invocation=False)
+
+        self.cog._modlog_cleaned_messages.assert_awaited_once()
+        self.assertEqual(self.cog._modlog_cleaned_messages.await_args.args[0], [42])
+        self.assertFalse(self.cog.cleaning)
+
+    async def test_clean_reports_slow_regex_to_invoker(self):
+        """A regex pattern timing out should end the clean and be reported to the invoker."""
+        self.cog._delete_found = AsyncMock(side_effect=BadArgument("Regex pattern is too slow."))
+        self.cog._send_expiring_message = AsyncMock()
+        self.cog._delete_invocation = AsyncMock()
+
+        self.assertIsNone(
+            await self.cog._clean_messages(self.ctx, None, first_limit=MockMessage(), attempt_delete_invocation=False)
+        )
+
+        self.cog._send_expiring_message.assert_awaited_once_with(self.ctx, ":x: Regex pattern is too slow.")
+        self.cog._modlog_cleaned_messages.assert_not_awaited()
+        self.assertFalse(self.cog.cleaning)
+
+    async def test_unexpected_error_cancels_clean(self):
+        """An unexpected error should stop whatever is left of the clean."""
+        self.cog.cleaning = True
+
+        await self.cog.cog_command_error(self.ctx, CommandInvokeError(RuntimeError()))
+
+        self.assertTrue(self.cog._cancel.is_set())
+        self.assertFalse(self.cog.cleaning)
+
+
+class CleanPredicateTests(unittest.TestCase):
+    """Tests for the predicates built by the clean cog."""
+
+    def setUp(self):
+        self.now = datetime.now(UTC)
+
+    def message_at(self, created_at: datetime, **kwargs) -> MockMessage:
+        """Return a mocked message with an ID matching the given creation time."""
+        return MockMessage(id=time_snowflake(created_at), created_at=created_at, **kwargs)
+
+    def test_predicate_after_limit(self):
+        """Only messages sent after the limit should match."""
+        predicate = Clean._build_predicate(self.now - timedelta(minutes=10))
+
+        self.assertTrue(predicate(self.message_at(self.now - timedelta(minutes=5))))
+        self.assertFalse(predicate(self.message_at(self.now - timedelta(minutes=15))))
+
+    def test_predicate_between_limits(self):
+        """Only messages sent between the limits should match, with the limits themselves excluded."""
+        first_limit = self.message_at(self.now - timedelta(minutes=10))
+        second_limit = self.message_at(self.now - timedelta(minutes=5))
+        predicate = Clean._build_predicate(first_limit.created_at, second_limit.created_at)
+
+        self.assertTrue(predicate(self.message_at(self.now - timedelta(minutes=7))))
+        self.assertFalse(predicate(self.message_at(self.now - timedelta(minutes=2))))
+        self.assertFalse(predicate(self.message_at(self.now - timedelta(minutes=12))))
+        self.assertFalse(predicate(first_limit))
+        self.assertFalse(predicate(second_limit))
+
+    def test_predicate_combines_all_checks(self):
+        """A message should only match if it passes every check."""
+        predicate = Clean._build_predicate(self.now - timedelta(minutes=10), bots_only=True)
+        created_at = self.now - timedelta(minutes=5)
+
+        self.assertTrue(predicate(self.message_at(created_at, author=MockMember(bot=True))))
+        self.assertFalse(predicate(self.message_at(created_at, author=MockMember(bot=False))))
+
+    def test_predicate_regex_with_age_limit(self):
+        """A regex clean should match on the content or embeds of messages sent after the limit."""
+        predicate = Clean._build_predicate(self.now - timedelta(minutes=10), regex=regex.compile("spam"))
+        created_at = self.now - timedelta(minutes=5)
+        embed = Embed(title="eggs").add_field(name="ham", value="spam")
+
+        self.assertTrue(predicate(self.message_at(created_at, content="spam", embeds=[])))
+        self.assertTrue(predicate(self.message_at(created_at, content="", embeds=[embed])))
+        self.assertFalse(predicate(self.message_at(created_at, content="eggs", embeds=[])))
+        self.assertFalse(predicate(self.message_at(self.now - timedelta(minutes=15), content="spam", embeds=[])))
+
+    def test_predicate_literal_regex_ignores_case(self):
+        """A pattern without metacharacters should match its text regardless of case."""
+        predicate = Clean._build_predicate(
+            self.now - timedelta(minutes=10), regex=regex.compile("Spam", regex.IGNORECASE | regex.DOTALL)
+        )
+        created_at = self.now - timedelta(minutes=5)
+
+        self.assertTrue(predicate(self.message_at(created_at, content="eggs and SPAM", embeds=[])))
+        self.assertFalse(predicate(self.message_at(created_at, content="eggs and ham", embeds=[])))
+        self.assertTrue(predicate(self.message_at(created_at, content="\u212a eggs and SPAM", embeds=[])))
+        self.assertFalse(predicate(self.message_at(created_at, content="\u212a eggs and ham", embeds=[])))
+
+    def test_predicate_literal_regex_follows_pattern_flags(self):
+        """A pattern without metacharacters should match like the regex engine would with the pattern's flags."""
+        limit, created_at = self.now - timedelta(minutes=10), self.now - timedelta(minutes=5)
+        case_sensitive = Clean._build_predicate(limit, regex=regex.compile("spam"))
+        kelvin = Clean._build_predicate(limit, regex=regex.compile("k", regex.IGNORECASE))
+        sharp_s = Clean._build_predicate(limit, regex=regex.compile("ss", regex.IGNORECASE))
+        sigma = Clean._build_predicate(limit, regex=regex.compile("\u03c3", regex.IGNORECASE))
+
+        self.assertFalse(case_sensitive(self.message_at(created_at, content="SPAM", embeds=[])))
+        self.assertTrue(kelvin(self.message_at(created_at, content="\u212a", embeds=[])))
+        self.assertFalse(sharp_s(self.message_at(created_at, content="\u00df", embeds=[])))
+        self.assertTrue(sigma(self.message_at(created_at, content="\u03c2", embeds=[])))
+
+    def test_predicate_regex_search_timeout(self):
+        """A regex search which takes too long should abort the clean."""
+        predicate = Clean._build_predicate(self.now - timedelta(minutes=10), regex=regex.compile("(a|aa)+$"))
+        message = self.message_at(self.now - timedelta(minutes=5), content="a" * 40 + "!", embeds=[])
+
+        with self.assertRaises(BadArgument):
+            predicate(message)
+
+
+class CleanDeletionTests(unittest.IsolatedAsyncioTestCase):
+    """Tests for the deletion of messages found by the clean cog."""
+
+    def setUp(self):
+        self.bot = MockBot()
+        self.cog = Clean(self.bot)
+        self.channel = MockTextChannel()
+        now = datetime.now(UTC)
+
+        self.old_message = MockMessage(id=time_snowflake(now - timedelta(days=20)), channel=self.channel)
+        self.young_messages = [
+            MockMessage(id=time_snowflake(now - timedelta(minutes=150 - i)), channel=self.channel) for i in range(150)
+        ]
+
+    def mock_history(self, *messages: MockMessage) -> None:
+        """Make the channel history yield `messages`, suspending after each one like fetching pages would."""
+        async def history(**kwargs):
+            for message in messages:
+                yield message
+                await asyncio.sleep(0)
+
+        self.channel.history = MagicMock(side_effect=history)
+
+    async def test_delete_from_channels_deletes_in_bulk_and_individually(self):
+        """Young messages should be deleted in batches of 100, and old messages individually."""
+        self.mock_history(self.old_message, *self.young_messages)
+
+        deleted = await self.cog._delete_from_channels([self.channel], lambda m: True, datetime.now(UTC))
+
+        self.old_message.delete.assert_awaited_once()
+        self.assertEqual(
+            [call.args[0] for call in self.channel.delete_messages.await_args_list],
+            [self.young_messages[:100], self.young_messages[100:]],
+        )
+        self.assertCountEqual(deleted, [self.old_message, *self.young_messages])
+
+    async def test_delete_from_channels_skips_unmatched_messages(self):
+        """Messages not matching the predicate should not be deleted."""
+        self.mock_history(*self.young_messages)
+        to_keep = set(self.young_messages[::2])
+
+        deleted = await self.cog._delete_from_channels([self.channel], lambda m: m not in to_keep, datetime.now(UTC))
+
+        self.assertCountEqual(deleted, self.young_messages[1::2])
+        self.channel.delete_messages.assert_awaited_once_with(self.young_messages[1::2])
+
+    async def test_delete_from_channels_cancelled_during_bulk_deletion(self):
+        """Cancelling while a bulk is deleted should stop the history and return the messages deleted so far."""
+        self.mock_history(*self.young_messages)
+        self.channel.delete_messages.side_effect = lambda messages: self.cog._cancel.set()
+
+        deleted = await self.cog._delete_from_channels([self.channel], lambda m: True, datetime.now(UTC))
+
+        self.assertEqual(deleted, self.young_messages[:100])
+        self.channel.delete_messages.assert_awaited_once_with(self.young_messages[:100])
+
+    async def test_delete_from_channels_cancelled_without_matches(self):
+        """Cancelling should stop fetching the history even if no more messages match."""
+        fetched = []
+
+        async def history(**kwargs):
+            for message in self.young_messages:
+                fetched.append(message)
+                if len(fetched) == 10:
+                    self.cog._cancel.set()
+                yield message
+                await asyncio.sleep(0)
+
+        self.channel.history = MagicMock(side_effect=history)
+
+        deleted = await self.cog._delete_from_channels([self.channel], lambda m: False, datetime.now(UTC))
+
+        self.assertEqual(deleted, [])
+        self.assertLess(len(fetched), len(self.young_messages))
+
+    async def test_delete_from_channels_failure_stops_other_channels(self):
+        """A failure in one channel's history should stop the other channels before they delete anything else."""
+        self.mock_history(*self.young_messages)
+        failing_channel = MockTextChannel()
+
+        async def failing_history(**kwargs):
+            raise HTTPException(MagicMock(status=500), "error")
+            yield
+
+        failing_channel.history = MagicMock(side_effect=failing_history)
+        deleted = []
+
+        with self.assertRaises(HTTPException):
+            await self.cog._delete_from_channels(
+                [self.channel, failing_channel], lambda m: True, datetime.now(UTC), deleted=deleted
+            )
+
+        self.assertTrue(self.cog._cancel.is_set())
+        self.channel.delete_messages.assert_not_awaited()
+        self.assertEqual(deleted, [])
+
+    async def test_delete_found_deletes_messages_near_bulk_limit_individually(self):
+        """Messages about to reach the bulk deletion limit should be deleted individually."""
+        near_limit = MockMessage(
+            id=time_snowflake(datetime.now(UTC) - timedelta(days=14) + timedelta(seconds=10)), channel=self.channel
+        )
+        young = self.young_messages[::-1]
+
+        deleted = await self.cog._delete_found({self.channel: [*young, near_limit]})
+
+        near_limit.delete.assert_awaited_once()
+        self.assertEqual(
+            [call.args[0] for call in self.channel.delete_messages.await_args_list], [young[:100], young[100:]]
+        )
+        self.assertCountEqual(deleted, [*young, near_limit])
+
+    async def test_delete_found_failure_stops_other_channels(self):
+        """A failure in one channel should stop the others, and the messages deleted until then should be kept."""
+        failing_channel = MockTextChannel()
+        failing_channel.delete_messages.side_effect = HTTPException(MagicMock(status=500), "error")
+
+        async def delete_messages(messages):
+            # Let the failing channel run while the first bulk is being deleted.
+            await asyncio.sleep(0)
+
+        self.channel.delete_messages.side_effect = delete_messages
+        young = self.young_messages[::-1]
+        deleted = []
+
+        with self.assertRaises(HTTPException):
+            await self.cog._delete_found(
+                {self.channel: young, failing_channel: [MockMessage(id=young[0].id, channel=failing_channel)]},
+                deleted,
+            )
+
+        self.assertTrue(self.cog._cancel.is_set())
+        self.channel.delete_messages.assert_awaited_once_with(young[:100])
+        self.assertEqual(deleted, young[:100])
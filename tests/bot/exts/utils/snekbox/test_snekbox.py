@@ -65,10 +65,20 @@ class SnekboxTests(unittest.IsolatedAsyncioTestCase):
         result = await self.cog.upload_output("-" * (MAX_PASTE_SIZE + 1))
         self.assertEqual(result, "too long to upload")
 
+    async def test_format_output_skips_upload_when_too_long(self):
+        """Output longer than MAX_PASTE_SIZE shouldn't be sent to the paste service."""
+        self.cog.upload_output = AsyncMock()
+
+        _, paste_task = self.cog.format_output("-" * (MAX_PASTE_SIZE + 1))
+
+        self.assertEqual(await paste_task, "too long to upload")
+        self.cog.upload_output.assert_not_called()
+
     async def test_codeblock_converter(self):
         ctx = MockContext()
         cases = (
             ('print("Hello world!")', 'print("Hello world!")', "non-formatted"),
+            ("\n  \n    if x:\n        y\n \t\n", "if x:\n    y", "non-formatted with surrounding whitespace"),
             ('`print("Hello world!")`', 'print("Hello world!")', "one line code block"),
             ('```\nprint("Hello world!")```', 'print("Hello world!")', "multiline code block"),
             ('```py\nprint("Hello world!")```', 'print("Hello world!")', "multiline python code block"),
@@ -242,7 +252,9 @@ class SnekboxTests(unittest.IsolatedAsyncioTestCase):
         )
         for case, expected, testname in cases:
             with self.subTest(msg=testname, case=case, expected=expected):
-                self.assertEqual(await self.cog.format_output(case), expected)
+                output, paste_task = self.cog.format_output(case)
+                paste_link = await paste_task if paste_task else None
+                self.assertEqual((output, paste_link), expected)
 
     async def test_eval_command_evaluate_once(self):
         """Test the eval command procedure."""
@@ -273,6 +285,18 @@ class SnekboxTests(unittest.IsolatedAsyncioTestCase):
         self.cog.send_job.assert_called_with(ctx, expected_job)
         self.cog.continue_job.assert_called_with(ctx, response, "eval")
 
+    async def test_eval_command_forgets_job_when_reevaluation_is_locked(self):
+        """Test that the job is forgotten if its re-evaluation is rejected because another one is running."""
+        ctx = MockContext()
+        ctx.command = MagicMock()
+        self.cog.send_job = AsyncMock(side_effect=(MockMessage(), LockedResourceError("user", ctx.author.id)))
+        self.cog.continue_job = AsyncMock(return_value=EvalJob.from_code("MyAwesomeFormattedCode"))
+
+        await self.cog.eval_command(self.cog, ctx=ctx, python_version="3.12", code=["MyAwesomeCode"])
+
+        ctx.send.assert_awaited_once()
+        self.assertNotIn(ctx.message.id, self.cog.jobs)
+
     async def test_eval_command_reject_two_eval_at_the_same_time(self):
         """Test if the eval command rejects an eval if the author already have a running eval."""
         ctx = MockContext()
@@ -298,7 +322,7 @@ class SnekboxTests(unittest.IsolatedAsyncioTestCase):
 
         eval_result = EvalResult("", 0)
         self.cog.post_job = AsyncMock(return_value=eval_result)
-        self.cog.format_output = AsyncMock(return_value=("[No output]", None))
+        self.cog.format_output = MagicMock(return_value=("[No output]", None))
         self.cog.upload_output = AsyncMock()  # Should not be called
 
         mocked_filter_cog = MagicMock()
@@ -325,11 +349,14 @@ class SnekboxTests(unittest.IsolatedAsyncioTestCase):
     async def test_send_job_with_paste_link(self):
         """Test the send_job function with a too long output that generate a paste link."""
         ctx = MockContext()
-        ctx.send = AsyncMock()
+        response = MockMessage()
+        ctx.send = AsyncMock(return_value=response)
 
         eval_result = EvalResult("Way too long beard", 0)
         self.cog.post_job = AsyncMock(return_value=eval_result)
-        self.cog.format_output = AsyncMock(return_value=("Way too long beard", "lookatmybeard.com"))
+        paste_task = asyncio.get_running_loop().create_future()
+        paste_task.set_result("lookatmybeard.com")
+        self.cog.format_output = MagicMock(return_value=("Way too long beard", paste_task))
 
         mocked_filter_cog = MagicMock()
         mocked_filter_cog.filter_snekbox_output = AsyncMock(return_value=(False, []))
@@ -343,12 +370,49 @@ class SnekboxTests(unittest.IsolatedAsyncioTestCase):
             ctx.send.call_args.args[0],
             ":white_check_mark: Your 3.12 eval job "
             "has completed with return code 0."
+            "\n\n```ansi\nWay too long beard\n```"
+        )
+        response.edit.assert_called_once_with(
+            content=":white_check_mark: Your 3.12 eval job "
+            "has completed with return code 0."
             "\n\n```ansi\nWay too long beard\n```\nFull output: lookatmybeard.com"
         )
 
         self.cog.post_job.assert_called_once_with(job)
         self.cog.format_output.assert_called_once_with("Way too long beard")
 
+    async def test_send_job_upload_error_after_response(self):
+        """An error uploading the full output shouldn't fail the job once the response was sent."""
+        ctx = MockContext()
+        response = MockMessage()
+        ctx.send = AsyncMock(return_value=response)
+
+        self.cog.post_job = AsyncMock(return_value=EvalResult("Way too long beard", 0))
+        paste_task = asyncio.get_running_loop().create_future()
+        paste_task.set_exception(ValueError("Invalid paste"))
+        self.cog.format_output = MagicMock(return_value=("Way too long beard", paste_task))
+        self.bot.get_cog.return_value = None
+
+        result = await self.cog.send_job(ctx, EvalJob.from_code("MyAwesomeCode"))
+
+        self.assertIs(result, response)
+        self.assertTrue(response.edit.call_args.kwargs["content"].endswith("\nFull output: unable to upload"))
+
+    async def test_send_job_cancels_upload_if_response_fails(self):
+        """The upload of the full output should be cancelled if the response can't be sent."""
+        ctx = MockContext()
+        ctx.send = AsyncMock(side_effect=ValueError("Can't send"))
+
+        self.cog.post_job = AsyncMock(return_value=EvalResult("Way too long beard", 0))
+        paste_task = asyncio.get_running_loop().create_future()
+        self.cog.format_output = MagicMock(return_value=("Way too long beard", paste_task))
+        self.bot.get_cog.return_value = None
+
+        with self.assertRaises(ValueError):
+            await self.cog.send_job(ctx, EvalJob.from_code("MyAwesomeCode"))
+
+        self.assertTrue(paste_task.cancelled())
+
     async def test_send_job_with_non_zero_eval(self):
         """Test the send_job function with a code returning a non-zero code."""
         ctx = MockContext()